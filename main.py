@@ -6,9 +6,19 @@ Privacy-first: no storage, no logging of image content.
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.responses import StreamingResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import io
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+import cv2
+import numpy as np
+from PIL import Image
+from detector import FACE_CASCADE_PATH, get_detector
 from processor import process_face_image
+from workers import set_thread_workers
 
 # Configure logging (no image content logging)
 logging.basicConfig(
@@ -17,10 +27,62 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Worker processes for image work; with uvicorn --workers K, each server
+# process gets its own pool, so set this to roughly cores / K
+PROCESS_WORKERS = int(os.environ.get('PROCESS_WORKERS', os.cpu_count() or 1))
+
+
+def _init_worker() -> None:
+    """Keep processes x threads near the core count inside each worker."""
+    cv2.setNumThreads(1)
+    set_thread_workers((os.cpu_count() or 1) // PROCESS_WORKERS)
+
+
+def _make_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=PROCESS_WORKERS,
+        initializer=_init_worker
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run CPU-bound image work in worker processes, off the event loop."""
+    logger.info(f"Face cascade: {FACE_CASCADE_PATH}")
+    app.state.pool = _make_pool()
+    app.state.pool_lock = asyncio.Lock()
+    yield
+    app.state.pool.shutdown()
+
+
+async def run_in_pool(fn, *args):
+    """
+    Run fn in the worker pool.
+    If a worker died (e.g. OOM-killed), the pool is broken for good: replace
+    it and answer 503 rather than failing every later request. The request
+    is not retried, since its input may be what killed the worker.
+    """
+    pool = app.state.pool
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        async with app.state.pool_lock:
+            # Another request may already have replaced it
+            if app.state.pool is pool:
+                logger.error("Worker process died; restarting the worker pool")
+                pool.shutdown(wait=False)
+                app.state.pool = _make_pool()
+        raise HTTPException(
+            status_code=503,
+            detail="Processing worker restarted. Please try again."
+        )
+
+
 app = FastAPI(
     title="AI Visibility Control",
     description="Give users control over how AI models perceive their images",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -35,6 +97,67 @@ app.add_middleware(
 # Supported formats
 ALLOWED_FORMATS = {'image/jpeg', 'image/jpg', 'image/png'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_IMAGE_PIXELS = 50 * 1000 * 1000  # 50MP; a small PNG can decode to far more
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+async def read_upload(image: UploadFile) -> bytearray:
+    """
+    Read an upload into a single buffer, chunk by chunk.
+    Rejects oversized files up front when the size is known, otherwise
+    as soon as the limit is crossed.
+    """
+    too_large = HTTPException(status_code=413, detail="File too large. Max size: 10MB")
+    
+    if image.size is not None and image.size > MAX_FILE_SIZE:
+        raise too_large
+    
+    buf = bytearray()
+    while chunk := await image.read(UPLOAD_CHUNK_SIZE):
+        buf.extend(chunk)
+        if len(buf) > MAX_FILE_SIZE:
+            raise too_large
+    return buf
+
+
+def check_image_pixels(img_bytes: bytes) -> None:
+    """
+    Reject images whose header declares more than MAX_IMAGE_PIXELS, before
+    anything is decoded. Unreadable headers are left to cv2.imdecode.
+    """
+    too_large = HTTPException(status_code=413, detail="Image dimensions too large. Max: 50 megapixels")
+    try:
+        with Image.open(io.BytesIO(img_bytes)) as header:
+            width, height = header.size
+    except Image.DecompressionBombError:
+        raise too_large
+    except Exception:
+        return
+    
+    if width * height > MAX_IMAGE_PIXELS:
+        raise too_large
+
+
+def analyze_image_bytes(img_bytes: bytes) -> dict:
+    """Detect faces in an encoded image and summarize (no processing)."""
+    nparr = np.frombuffer(img_bytes, np.uint8)
+    # Detection only needs luma, so decode straight to grayscale
+    img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+    
+    if img is None:
+        raise ValueError("Invalid image format")
+    
+    detector = get_detector()
+    faces = detector.detect_faces_gray(img)
+    
+    return {
+        "faces_detected": len(faces),
+        "processable": len(faces) > 0,
+        "image_size": {
+            "width": img.shape[1],
+            "height": img.shape[0]
+        }
+    }
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -98,18 +221,13 @@ async def process_image(
         )
     
     # Read image bytes (in memory only)
+    img_bytes = None
     try:
-        img_bytes = await image.read()
-        
-        # Check file size
-        if len(img_bytes) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail="File too large. Max size: 10MB"
-            )
+        img_bytes = await read_upload(image)
+        check_image_pixels(img_bytes)
         
-        # Process image
-        result_bytes, metadata = process_face_image(img_bytes, mode)
+        # Process image in the worker pool
+        result_bytes, metadata = await run_in_pool(process_face_image, img_bytes, mode)
         
         # Log success (no image content)
         logger.info(
@@ -129,6 +247,9 @@ async def process_image(
             }
         )
         
+    except HTTPException:
+        raise
+    
     except ValueError as e:
         # Handle processing errors
         logger.warning(f"Processing failed: {str(e)}")
@@ -156,35 +277,16 @@ async def analyze_image(image: UploadFile = File(...)):
     """
     logger.info(f"Analysis request - filename: {image.filename}")
     
+    img_bytes = None
     try:
-        img_bytes = await image.read()
-        
-        if len(img_bytes) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail="File too large")
-        
-        # Detect faces only
-        from detector import FaceDetector
-        import cv2
-        import numpy as np
+        img_bytes = await read_upload(image)
+        check_image_pixels(img_bytes)
         
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            raise ValueError("Invalid image format")
-        
-        detector = FaceDetector()
-        faces = detector.detect_faces(img)
-        
-        return {
-            "faces_detected": len(faces),
-            "processable": len(faces) > 0,
-            "image_size": {
-                "width": img.shape[1],
-                "height": img.shape[0]
-            }
-        }
+        # Detect faces only, in the worker pool
+        return await run_in_pool(analyze_image_bytes, img_bytes)
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
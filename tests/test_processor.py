@@ -0,0 +1,152 @@
+"""
+Equivalence checks for the optimized zone-processing steps.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+import kernels
+from processor import ImageProcessor, ProcessingMode, _group_overlapping, _merge_boxes
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.mark.parametrize('shift', [0, 1, 2, 3])
+@pytest.mark.parametrize('zone_name', ['eye', 'nose_bridge'])
+@pytest.mark.parametrize('shape', [(17, 23), (3, 3)])
+def test_asymmetry_matches_warp_affine_reflect(rng, shift, zone_name, shape):
+    zone = rng.integers(0, 256, shape + (3,), dtype=np.uint8)
+    h, w = shape
+    processor = ImageProcessor(ProcessingMode('Test', 5, 0.05, shift))
+
+    if zone_name == 'eye':
+        M = np.float32([[1, 0, shift], [0, 1, 0]])
+    else:
+        M = np.float32([[1, 0, 0], [0, 1, shift]])
+    expected = cv2.warpAffine(zone, M, (w, h), borderMode=cv2.BORDER_REFLECT)
+
+    np.testing.assert_array_equal(processor._apply_asymmetry(zone, zone_name), expected)
+
+
+def test_asymmetry_writes_into_strided_dst(rng):
+    zone = rng.integers(0, 256, (10, 12, 3), dtype=np.uint8)
+    scratch = np.zeros((20, 20, 3), dtype=np.uint8)
+    processor = ImageProcessor(ProcessingMode('Test', 5, 0.05, 2))
+
+    shifted = processor._apply_asymmetry(zone, 'eye', dst=scratch[:10, :12])
+
+    assert np.shares_memory(shifted, scratch)
+    np.testing.assert_array_equal(scratch[:10, 2:12], zone[:, :10])
+
+
+def _blend_reference(orig, proc, mask, noise):
+    m = mask[:, :, np.newaxis]
+    out = proc * m + orig * (1 - m) + (noise * mask)[:, :, np.newaxis]
+    return np.clip(np.rint(out), 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize('blend, weights', [
+    (kernels.blend_noise, kernels.mask_weights),
+    (kernels._blend_noise_cv, kernels._mask_weights_cv),
+])
+def test_blend_noise_within_one_level_of_float_reference(rng, blend, weights):
+    h, w = 27, 36
+    img = rng.integers(0, 256, (h + 10, w + 10, 3), dtype=np.uint8)
+    orig = img[5:5+h, 5:5+w]
+    proc = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    mask = rng.random((h, w)).astype(np.float32)
+    mask[0, :] = 0
+    mask[-1, :] = 1
+    noise = np.rint(rng.standard_normal((h, w)) * 40).astype(np.int16)
+    expected = _blend_reference(orig.astype(np.float64), proc, mask, noise)
+    before = img.copy()
+
+    result = blend(orig, proc, weights(mask), noise, orig)
+
+    assert np.shares_memory(result, img)
+    diff = np.abs(img[5:5+h, 5:5+w].astype(int) - expected)
+    assert diff.max() <= 1
+    # Pixels outside the zone are untouched
+    outside = np.ones(img.shape[:2], dtype=bool)
+    outside[5:5+h, 5:5+w] = False
+    np.testing.assert_array_equal(img[outside], before[outside])
+
+
+def _overlaps(a, b):
+    _, axs, ays, axe, aye = a
+    _, bxs, bys, bxe, bye = b
+    return axs < bxe and bxs < axe and ays < bye and bys < aye
+
+
+def test_group_overlapping_chains_overlaps_and_keeps_their_order():
+    a = ('eye', 0, 0, 10, 10)
+    b = ('eye', 20, 0, 30, 10)
+    c = ('nose_bridge', 5, 5, 25, 8)  # overlaps both a and b
+    d = ('eye', 100, 100, 110, 110)
+
+    groups = _group_overlapping([a, b, c, d])
+
+    assert sorted(map(sorted, groups)) == sorted([sorted([a, b, c]), [d]])
+    chained = next(g for g in groups if c in g)
+    assert chained.index(a) < chained.index(c)
+    assert chained.index(b) < chained.index(c)
+
+
+def test_group_overlapping_separates_touching_regions():
+    # Exclusive ends: sharing an edge coordinate means no shared pixels
+    a = ('eye', 0, 0, 10, 10)
+    b = ('eye', 10, 0, 20, 10)
+    c = ('eye', 0, 10, 10, 20)
+
+    groups = _group_overlapping([a, b, c])
+
+    assert len(groups) == 3
+
+
+def test_group_overlapping_groups_share_no_pixels(rng):
+    regions = []
+    for _ in range(30):
+        x, y = rng.integers(0, 100, 2)
+        w, h = rng.integers(1, 25, 2)
+        regions.append(('eye', int(x), int(y), int(x + w), int(y + h)))
+
+    groups = _group_overlapping(regions)
+
+    assert sorted(r for g in groups for r in g) == sorted(regions)
+    for i, group in enumerate(groups):
+        for other in groups[i + 1:]:
+            assert not any(_overlaps(r, o) for r in group for o in other)
+        # Overlapping regions stay in their original relative order
+        for j, r in enumerate(group):
+            for o in group[j + 1:]:
+                if _overlaps(r, o):
+                    assert regions.index(r) < regions.index(o)
+
+
+def test_merge_boxes_unions_overlapping_zones():
+    zones = [
+        ('eye', (0, 0, 10, 10)),
+        ('eye', (50, 0, 10, 10)),
+        ('nose_bridge', (5, 5, 50, 10)),  # bridges both eyes
+        ('eye', (200, 200, 5, 5)),
+    ]
+
+    merged = _merge_boxes(zones)
+
+    assert merged == [('eye', (0, 0, 60, 15)), ('eye', (200, 200, 5, 5))]
+
+
+def test_merge_boxes_keeps_first_name_without_eyes():
+    zones = [('nose_bridge', (0, 0, 10, 10)), ('cheek', (5, 5, 10, 10))]
+
+    assert _merge_boxes(zones) == [('nose_bridge', (0, 0, 15, 15))]
+
+
+def test_merge_boxes_leaves_touching_zones_apart():
+    zones = [('eye', (0, 0, 10, 10)), ('eye', (10, 0, 10, 10)), ('nose_bridge', (0, 10, 10, 10))]
+
+    assert _merge_boxes(zones) == zones
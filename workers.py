@@ -0,0 +1,40 @@
+"""
+Shared in-process thread pool for per-face and per-zone work.
+OpenCV and the blend kernel release the GIL, so these threads run in parallel.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List
+
+# Threads per process; main.py lowers this inside its worker processes so
+# processes x threads stays near the core count
+THREAD_WORKERS = int(os.environ.get('THREAD_WORKERS', os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def set_thread_workers(n: int) -> None:
+    """Resize the pool; takes effect for the next parallel_map call."""
+    global THREAD_WORKERS, _pool
+    with _pool_lock:
+        THREAD_WORKERS = max(1, n)
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def parallel_map(fn: Callable, items: Iterable) -> List:
+    """map() over the shared pool; runs inline for one item or one thread."""
+    global _pool
+    items = list(items)
+    if THREAD_WORKERS <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=THREAD_WORKERS)
+        pool = _pool
+    return list(pool.map(fn, items))